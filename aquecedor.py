@@ -0,0 +1,87 @@
+"""Aquecimento do cache do ano corrente em segundo plano.
+
+Uma thread por processo recalcula diario() e clientes() do ano corrente,
+com todas as seções, para cada região antes que a entrada expire. As
+regiões são espalhadas pelo intervalo, uma consulta de cada vez, para a
+carga no ERP não chegar em rajadas. Com o cache em disco, cada região é
+atualizada por um só processo do host em cada volta; os outros a leem do
+disco.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from datetime import date
+
+from cache_resultados import TTL_ANO_ABERTO, cache_resultados
+from metricas import metricas
+
+
+# Segundos entre duas atualizações do mesmo banco; menor que a validade do
+# ano aberto, para a entrada ser trocada antes de expirar. 0 desliga
+INTERVALO = float(os.environ.get('AQUECER_INTERVALO', TTL_ANO_ABERTO * 2 / 3))
+
+logger = logging.getLogger('vendas_fini.aquecedor')
+
+
+class Aquecedor:
+    """Mantém quente o ano corrente de todas as regiões.
+
+    A primeira volta roda logo ao iniciar, região após região. Depois cada
+    região é atualizada a cada `intervalo` segundos, com as regiões
+    distribuídas igualmente dentro dele e um deslocamento aleatório no
+    início, para réplicas diferentes não consultarem ao mesmo tempo.
+    """
+
+    def __init__(self, regioes, intervalo=INTERVALO):
+        self._regioes = list(regioes)
+        self._intervalo = intervalo
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._rodar, daemon=True, name='aquecedor')
+        self.atualizados = {}  # database -> instante da última atualização bem-sucedida
+
+    def iniciar(self):
+        if self._intervalo > 0 and self._regioes:
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+    def aquecer(self, database_name):
+        # Importa aqui: dados importa o Streamlit e este módulo é importado cedo
+        from dados import SECOES, clientes, diario
+
+        # Mesma chave que a tela usa quando só o ano corrente é pedido
+        anos = [str(date.today().year)]
+
+        # Os processos do host dividem o cache em disco: se outro aquecedor já
+        # atualizou a região nesta volta, este lê o resultado de lá
+        if not cache_resultados().reservar(('aquecer', database_name, *anos), self._intervalo * 0.9):
+            logger.info("%s já aquecido por outro processo", database_name)
+            return
+        try:
+            with metricas().medir('aquecimento', database_name):
+                diario.atualizar(database_name, anos, SECOES)
+                clientes.atualizar(database_name, anos, SECOES)
+        except Exception:
+            logger.exception("Falha ao aquecer o cache de %s", database_name)
+        else:
+            self.atualizados[database_name] = time.time()
+
+    def _rodar(self):
+        for regiao in self._regioes:
+            if self._parar.is_set():
+                return
+            self.aquecer(regiao.database)
+
+        passo = self._intervalo / len(self._regioes)
+        if self._parar.wait(random.uniform(0, passo)):
+            return
+        while True:
+            for regiao in self._regioes:
+                inicio = time.monotonic()
+                self.aquecer(regiao.database)
+                if self._parar.wait(max(0.0, passo - (time.monotonic() - inicio))):
+                    return
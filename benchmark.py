@@ -0,0 +1,134 @@
+"""Mede o pipeline de banco() e dos gráficos contra as réplicas de sintetico.py.
+
+    python sintetico.py --itens 1M --anos 2023 2024
+    python benchmark.py --anos 2023 2024 --repeticoes 5
+
+Para cada banco mede conexão, execução, leitura, tratamento e montagem dos
+gráficos, e o pipeline inteiro (banco() sem cache mais os gráficos). Mostra
+mediana, p95 e máximo de cada etapa em milissegundos.
+"""
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+import leitura
+
+
+ETAPAS = ('conexão', 'execução', 'leitura', 'tratamento', 'gráficos', 'pipeline', 'em cache')
+
+
+def _limpar_caches():
+    from cache_resultados import cache_resultados
+
+    for chave in cache_resultados().chaves():
+        cache_resultados().invalidar(chave)
+
+
+def _montar_graficos(mensal, dias):
+    import graficos
+
+    # Chama as funções sem o cache do Streamlit, senão só a primeira repetição monta
+    graficos.pizza.__wrapped__(mensal)
+    graficos.legenda.__wrapped__(mensal)
+    graficos.linha.__wrapped__(mensal)
+    graficos.positivacao.__wrapped__(mensal)
+    if not mensal.empty:
+        graficos.diario.__wrapped__(dias[dias['Mês'] == mensal['Mês'].iloc[0]])
+
+
+def medir(database_name, anos, secao):
+    """Tempos, em segundos, de uma execução do pipeline para um banco."""
+    from conexao import conector
+    from dados import (SECOES, banco, diario, fatiar, mensal, sql_clientes, sql_vendas,
+                       tratar_clientes, tratar_diario)
+
+    relogio = time.perf_counter
+    tempos = dict.fromkeys(ETAPAS, 0.0)
+
+    inicio = relogio()
+    connection = conector(database_name)()
+    tempos['conexão'] = relogio() - inicio
+    try:
+        quadros = {}
+        for tipo, sql in (('vendas', sql_vendas), ('clientes', sql_clientes)):
+            query, params = sql(database_name, anos, SECOES)
+            cursor = connection.cursor()
+            inicio = relogio()
+            cursor.execute(query, params)
+            tempos['execução'] += relogio() - inicio
+
+            inicio = relogio()
+            quadros[tipo] = leitura.dataframe(cursor)
+            tempos['leitura'] += relogio() - inicio
+            cursor.close()
+    finally:
+        connection.close()
+
+    inicio = relogio()
+    dias = tratar_diario(quadros['vendas'], database_name)
+    ativos = tratar_clientes(quadros['clientes'], database_name)
+    do_ano = fatiar(mensal(dias, ativos, database_name), secao, anos[-1])
+    dias_do_ano = fatiar(dias, secao, anos[-1])
+    tempos['tratamento'] = relogio() - inicio
+
+    inicio = relogio()
+    _montar_graficos(do_ano, dias_do_ano)
+    tempos['gráficos'] = relogio() - inicio
+
+    _limpar_caches()
+    inicio = relogio()
+    _montar_graficos(fatiar(banco(database_name, anos), secao, anos[-1]),
+                     fatiar(diario(database_name, anos), secao, anos[-1]))
+    tempos['pipeline'] = relogio() - inicio
+
+    inicio = relogio()
+    banco(database_name, anos)
+    tempos['em cache'] = relogio() - inicio
+    return tempos
+
+
+def resumir(medicoes):
+    """Mediana, p95 e máximo em ms por banco e etapa."""
+    df = pd.DataFrame(medicoes).melt(id_vars=['banco'], var_name='etapa', value_name='segundos')
+    df['ms'] = df['segundos'] * 1000
+    resumo = df.groupby(['banco', 'etapa'], sort=False)['ms'].agg(
+        mediana='median', p95=lambda ms: ms.quantile(0.95), maximo='max',
+    )
+    return resumo.sort_index(level='banco', sort_remaining=False).round(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de banco() nas réplicas sintéticas.")
+    parser.add_argument('--anos', nargs='+', required=True, help="anos consultados, como na tela")
+    parser.add_argument('--secao', default='FINI')
+    parser.add_argument('--bancos', nargs='+', help="bancos medidos (padrão: todas as regiões)")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--pasta', default='sintetico', help="pasta com as réplicas de sintetico.py")
+    parser.add_argument('--json', help="grava as medições brutas neste arquivo, para comparar depois")
+    args = parser.parse_args()
+
+    # Precisam estar definidos antes de importar conexao e o cache: as réplicas
+    # no lugar do ERP e só o cache em memória, que _limpar_caches esvazia sem
+    # tocar no cache em disco do dashboard
+    os.environ['BANCO_LOCAL'] = args.pasta
+    os.environ['CACHE_DIR'] = ''
+    from regioes import REGIOES
+
+    bancos = args.bancos or [regiao.database for regiao in REGIOES]
+    anos = sorted(args.anos)
+    medicoes = []
+    for database_name in bancos:
+        for _ in range(args.repeticoes):
+            medicoes.append({'banco': database_name, **medir(database_name, anos, args.secao)})
+
+    print(resumir(medicoes).to_string())
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(medicoes, arquivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
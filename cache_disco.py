@@ -0,0 +1,167 @@
+"""Segundo nível do cache de resultados, em disco e compartilhado.
+
+Os DataFrames ficam em arquivos Parquet numa pasta (CACHE_DIR) e o índice
+num SQLite ao lado, que cuida do acesso concorrente entre os processos do
+mesmo host. Réplicas e reinícios começam com o cache quente. Cada arquivo
+é gravado num temporário e renomeado, então ninguém lê um arquivo pela
+metade.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+
+import pandas as pd
+
+
+# Pasta do cache; vazia desliga o cache em disco
+PASTA_CACHE = os.environ.get('CACHE_DIR', 'cache')
+
+# Troque quando o formato dos DataFrames guardados mudar: entradas de outras
+# versões são ignoradas e apagadas no próximo despejo
+VERSAO = 3
+
+# De onde vêm os dados guardados: o ERP, os snapshots (FONTE_DADOS) ou uma
+# réplica sintética (BANCO_LOCAL). Entra na chave, para que resultados de
+# uma origem nunca sejam servidos como sendo de outra
+if os.environ.get('BANCO_LOCAL'):
+    ORIGEM = 'local:' + os.path.abspath(os.environ['BANCO_LOCAL'])
+else:
+    ORIGEM = os.environ.get('FONTE_DADOS', 'erp')
+
+# Falhas do disco não derrubam a consulta: o cache em disco é só atalho
+ERROS_DISCO = (OSError, ValueError, sqlite3.Error)
+
+TAMANHO_MAXIMO = int(os.environ.get('CACHE_DISCO_MAXIMO', 1024 * 1024 * 1024))  # bytes dos arquivos
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    chave TEXT PRIMARY KEY,
+    versao INTEGER NOT NULL,
+    arquivo TEXT NOT NULL,
+    expira REAL,  -- NULL: não expira
+    tamanho INTEGER NOT NULL,
+    acesso REAL NOT NULL
+);
+-- Tarefas que só um processo do host deve fazer de cada vez, como aquecer
+-- uma região: quem grava a linha primeiro fica com ela até `ate`
+CREATE TABLE IF NOT EXISTS reservas (
+    nome TEXT PRIMARY KEY,
+    ate REAL NOT NULL
+);
+"""
+
+
+class CacheDisco:
+    """DataFrames por chave em Parquet, com validade e despejo por tamanho (LRU)."""
+
+    def __init__(self, pasta=PASTA_CACHE, tamanho_maximo=TAMANHO_MAXIMO, origem=ORIGEM):
+        self._pasta = pasta
+        self._tamanho_maximo = tamanho_maximo
+        self._origem = origem
+        os.makedirs(pasta, exist_ok=True)
+        with self._indice() as indice:
+            indice.execute('PRAGMA journal_mode = WAL')
+            indice.executescript(ESQUEMA)
+
+    def _indice(self):
+        # Uma conexão por operação: o objeto é usado por várias threads
+        connection = sqlite3.connect(os.path.join(self._pasta, 'indice.sqlite'), timeout=30)
+        connection.isolation_level = None
+        return closing(connection)
+
+    def _texto(self, chave):
+        return json.dumps([self._origem, *chave], ensure_ascii=False)
+
+    def obter(self, chave):
+        """(DataFrame, expira) ou None se não houver entrada válida."""
+        texto = self._texto(chave)
+        with self._indice() as indice:
+            linha = indice.execute(
+                'SELECT arquivo, expira FROM entradas WHERE chave = ? AND versao = ?', (texto, VERSAO)
+            ).fetchone()
+            if linha is None:
+                return None
+            arquivo, expira = linha
+            if expira is not None and expira <= time.time():
+                self._remover(indice, texto)
+                return None
+            try:
+                df = pd.read_parquet(os.path.join(self._pasta, arquivo), engine='pyarrow')
+            except (OSError, ValueError):
+                # Arquivo apagado ou corrompido por fora: esquece a entrada
+                self._remover(indice, texto)
+                return None
+            indice.execute('UPDATE entradas SET acesso = ? WHERE chave = ?', (time.time(), texto))
+        return df, float('inf') if expira is None else expira
+
+    def guardar(self, chave, df, expira):
+        texto = self._texto(chave)
+        arquivo = hashlib.sha1(f'{VERSAO}:{texto}'.encode()).hexdigest() + '.parquet'
+        descritor, temporario = tempfile.mkstemp(dir=self._pasta, suffix='.parquet.tmp')
+        os.close(descritor)
+        try:
+            df.to_parquet(temporario, engine='pyarrow')
+            tamanho = os.path.getsize(temporario)
+            os.replace(temporario, os.path.join(self._pasta, arquivo))
+        except BaseException:
+            os.remove(temporario)
+            raise
+        with self._indice() as indice:
+            indice.execute(
+                'INSERT OR REPLACE INTO entradas VALUES (?, ?, ?, ?, ?, ?)',
+                (texto, VERSAO, arquivo, None if expira == float('inf') else expira, tamanho, time.time()),
+            )
+            self._despejar(indice)
+
+    def reservar(self, nome, segundos):
+        """True se este processo ficou com `nome` pelos próximos `segundos`.
+
+        False se outro processo do host o reservou e o prazo ainda não acabou.
+        """
+        agora = time.time()
+        with self._indice() as indice:
+            cursor = indice.execute(
+                'INSERT INTO reservas VALUES (?, ?) '
+                'ON CONFLICT (nome) DO UPDATE SET ate = excluded.ate WHERE reservas.ate <= ?',
+                (self._texto(nome), agora + segundos, agora),
+            )
+            return cursor.rowcount == 1
+
+    def invalidar(self, chave):
+        with self._indice() as indice:
+            self._remover(indice, self._texto(chave))
+
+    def _remover(self, indice, texto):
+        linha = indice.execute('SELECT arquivo FROM entradas WHERE chave = ?', (texto,)).fetchone()
+        if linha is not None:
+            indice.execute('DELETE FROM entradas WHERE chave = ?', (texto,))
+            self._apagar_arquivo(linha[0])
+
+    def _despejar(self, indice):
+        # Outras versões e vencidas primeiro; depois as menos usadas até caber
+        vencidas, params = 'versao <> ? OR expira <= ?', (VERSAO, time.time())
+        apagar = indice.execute(f'SELECT arquivo FROM entradas WHERE {vencidas}', params).fetchall()
+        indice.execute(f'DELETE FROM entradas WHERE {vencidas}', params)
+        total = indice.execute('SELECT COALESCE(SUM(tamanho), 0) FROM entradas').fetchone()[0]
+        if total > self._tamanho_maximo:
+            for chave, arquivo, tamanho in indice.execute(
+                'SELECT chave, arquivo, tamanho FROM entradas ORDER BY acesso'
+            ).fetchall():
+                if total <= self._tamanho_maximo:
+                    break
+                indice.execute('DELETE FROM entradas WHERE chave = ?', (chave,))
+                apagar.append((arquivo,))
+                total -= tamanho
+        for (arquivo,) in apagar:
+            self._apagar_arquivo(arquivo)
+
+    def _apagar_arquivo(self, arquivo):
+        try:
+            os.remove(os.path.join(self._pasta, arquivo))
+        except FileNotFoundError:
+            pass
+
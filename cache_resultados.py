@@ -0,0 +1,282 @@
+import functools
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date
+
+import pandas as pd
+from cachetools import LRUCache, TLRUCache
+
+from cache_disco import ERROS_DISCO, PASTA_CACHE, CacheDisco
+from metricas import metricas
+
+
+# Anos ainda abertos mudam a cada venda lançada; anos fechados não mudam mais
+TTL_ANO_ABERTO = 15 * 60  # segundos
+# Depois de uma falha o resultado antigo é servido da memória por este tempo,
+# sem que cada nova chamada volte a esperar pelo banco
+TTL_FALHA = 60  # segundos
+TAMANHO_MAXIMO = 256 * 1024 * 1024  # bytes somados dos DataFrames em cache
+
+logger = logging.getLogger('vendas_fini.cache')
+
+# Os frames do cache são entregues sem cópia (veja em_cache); o copy-on-write
+# garante que ninguém altera o original por uma referência compartilhada
+pd.set_option('mode.copy_on_write', True)
+
+
+def ano_fechado(ano):
+    try:
+        return int(ano) < date.today().year
+    except (TypeError, ValueError):
+        return False
+
+
+def _expiracao(chave, agora):
+    _, _, ano, _ = chave
+    anos = (ano,) if isinstance(ano, str) else ano
+    if all(ano_fechado(a) for a in anos):
+        return float('inf')
+    return agora + TTL_ANO_ABERTO
+
+
+# Os valores em memória são (DataFrame, expira): uma entrada lida do disco
+# vence no mesmo instante em que venceria no processo que a gravou
+def _validade(chave, valor, agora):
+    return valor[1]
+
+
+def _tamanho(valor):
+    return int(valor[0].memory_usage(index=True, deep=True).sum())
+
+
+class CacheResultados:
+    """Cache LRU limitado pelo tamanho dos DataFrames, com validade por chave.
+
+    A chave é (função, database, ano, seção). Entradas de anos fechados nunca
+    expiram, só saem por LRU; as do ano aberto valem TTL_ANO_ABERTO segundos.
+
+    Com `disco` (um CacheDisco), o que falta na memória é procurado no disco
+    e tudo que é guardado vai também para lá, para os outros processos.
+
+    O último resultado bom de cada chave continua disponível em reserva()
+    depois de vencer, para ser servido quando o banco falha.
+    """
+
+    def __init__(self, tamanho_maximo=TAMANHO_MAXIMO, disco=None):
+        self._lock = threading.Lock()
+        # Relógio de parede: a validade é comparada com a gravada no disco
+        self._dados = TLRUCache(maxsize=tamanho_maximo, ttu=_validade, getsizeof=_tamanho, timer=time.time)
+        # Os mesmos DataFrames de _dados, sem validade: ocupam memória a mais só
+        # enquanto guardam um resultado que já venceu
+        self._reservas = LRUCache(maxsize=tamanho_maximo, getsizeof=_tamanho)
+        self._disco = disco
+
+    def obter(self, chave):
+        with self._lock:
+            valor = self._dados.get(chave)
+        if valor is None and self._disco is not None:
+            try:
+                valor = self._disco.obter(chave)
+            except ERROS_DISCO:
+                logger.exception("Falha ao ler o cache em disco")
+            if valor is not None:
+                self._guardar_na_memoria(chave, valor)
+        return None if valor is None else valor[0]
+
+    def guardar(self, chave, df, expira=None):
+        """Guarda df até `expira` (instante de time.time()); por padrão, pela chave."""
+        if expira is None:
+            expira = _expiracao(chave, time.time())
+        valor = (df, expira)
+        self._guardar_na_memoria(chave, valor)
+        if self._disco is not None:
+            try:
+                self._disco.guardar(chave, *valor)
+            except ERROS_DISCO:
+                logger.exception("Falha ao gravar o cache em disco")
+
+    def reserva(self, chave):
+        """Último DataFrame guardado na chave, mesmo vencido, ou None."""
+        with self._lock:
+            valor = self._reservas.get(chave)
+        return None if valor is None else valor[0]
+
+    def prorrogar(self, chave, df, segundos):
+        """Serve df da memória por mais `segundos`, sem gravar no disco."""
+        self._guardar_na_memoria(chave, (df, time.time() + segundos))
+
+    def _guardar_na_memoria(self, chave, valor):
+        with self._lock:
+            try:
+                self._dados[chave] = valor
+                self._reservas[chave] = valor
+            except ValueError:
+                # Maior que o cache inteiro: não guarda
+                pass
+
+    def reservar(self, nome, segundos):
+        """True se cabe a este processo fazer a tarefa `nome` agora.
+
+        Com o disco, só um processo do host por vez fica com a tarefa pelos
+        próximos `segundos`; sem ele, ou se o disco falha, cada processo faz
+        a sua.
+        """
+        if self._disco is None:
+            return True
+        try:
+            return self._disco.reservar(nome, segundos)
+        except ERROS_DISCO:
+            logger.exception("Falha ao reservar %s no cache em disco", nome)
+            return True
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+            self._reservas.pop(chave, None)
+        if self._disco is not None:
+            self._disco.invalidar(chave)
+
+    def chaves(self):
+        with self._lock:
+            self._dados.expire()
+            return list(self._dados.keys())
+
+
+# Um cache por processo, compartilhado entre reruns e sessões e usado pelas
+# threads de carga, que não têm contexto de sessão do Streamlit. O disco é
+# compartilhado entre os processos do host. Criado no primeiro uso, e não na
+# importação, para que importar dados não crie a pasta do cache
+_cache = None
+_lock_cache = threading.Lock()
+
+
+def _abrir_disco():
+    if not PASTA_CACHE:
+        return None
+    try:
+        return CacheDisco()
+    except ERROS_DISCO:
+        # Sem disco o cache continua só em memória
+        logger.exception("Cache em disco indisponível em %s", PASTA_CACHE)
+        return None
+
+
+def cache_resultados():
+    global _cache
+    with _lock_cache:
+        if _cache is None:
+            _cache = CacheResultados(disco=_abrir_disco())
+        return _cache
+
+
+# Consultas em andamento por chave: quem pede a mesma chave enquanto ela está
+# sendo calculada espera o resultado em vez de consultar o banco de novo
+_em_andamento = {}
+_lock_andamento = threading.Lock()
+
+
+def _uma_vez(chave, calcular):
+    with _lock_andamento:
+        futuro = _em_andamento.get(chave)
+        dono = futuro is None
+        if dono:
+            futuro = _em_andamento[chave] = Future()
+    if not dono:
+        return futuro.result()
+    try:
+        df = calcular()
+    except BaseException as erro:
+        futuro.set_exception(erro)
+        raise
+    else:
+        futuro.set_result(df)
+        return df
+    finally:
+        with _lock_andamento:
+            del _em_andamento[chave]
+
+
+def em_cache(funcao):
+    """Decorador que guarda o resultado de funcao(database_name, ano, secao).
+
+    `ano` e `secao` podem ser listas; nesse caso a chave guarda a tupla.
+
+    Como no st.cache_data, argumentos começados com "_" não entram na chave.
+    Quem chama recebe uma cópia rasa do DataFrame guardado: os dados não são
+    copiados e, com o copy-on-write do pandas, qualquer alteração feita por
+    quem chamou copia só o que mudou, sem tocar no que está em cache.
+
+    Pedidos simultâneos da mesma chave que não está em cache fazem uma
+    consulta só: os demais esperam o resultado de quem chegou primeiro.
+
+    `funcao.atualizar(...)` recalcula e substitui a entrada mesmo que ainda
+    valha, sem que ela fique ausente do cache no meio do caminho.
+
+    Cada resultado leva em df.attrs['dados_de'] o instante da consulta. Se a
+    função falha (banco fora do ar, consulta cancelada, disjuntor aberto) e
+    há um resultado anterior da mesma chave, ele é devolvido com
+    df.attrs['antigo'] = True em vez do erro, e continua sendo servido assim
+    por TTL_FALHA segundos antes de o banco ser tentado de novo.
+    """
+    assinatura = inspect.signature(funcao)
+
+    def chave_de(args, kwargs):
+        argumentos = assinatura.bind(*args, **kwargs)
+        argumentos.apply_defaults()
+        database_name, ano, secao = (
+            valor for nome, valor in argumentos.arguments.items() if not nome.startswith('_')
+        )
+        ano = str(ano).strip() if isinstance(ano, (str, int)) else tuple(str(a).strip() for a in ano)
+        if not isinstance(secao, str):
+            secao = tuple(secao)
+        return (funcao.__name__, database_name, ano, secao)
+
+    def calcular(args, kwargs):
+        df = funcao(*args, **kwargs)
+        df.attrs['dados_de'] = time.time()
+        return df
+
+    def calcular_e_guardar(chave, args, kwargs):
+        # Outro pedido pode ter terminado entre o obter() e a vez deste
+        df = cache_resultados().obter(chave)
+        if df is None:
+            df = calcular(args, kwargs)
+            cache_resultados().guardar(chave, df)
+        return df
+
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        chave = chave_de(args, kwargs)
+        database_name = chave[1]
+
+        inicio = time.perf_counter()
+        cache = cache_resultados()
+        df = cache.obter(chave)
+        situacao = 'hit'
+        if df is None:
+            try:
+                df = _uma_vez(chave, lambda: calcular_e_guardar(chave, args, kwargs))
+            except Exception as erro:
+                df = cache.reserva(chave)
+                if df is None:
+                    raise
+                logger.warning("%s: servindo resultado antigo de %s (%s)", funcao.__name__, database_name, erro)
+                situacao = 'stale'
+                df = df.copy(deep=False)
+                df.attrs['antigo'] = True
+                cache.prorrogar(chave, df, TTL_FALHA)
+            else:
+                situacao = 'miss'
+        # A cópia rasa tem attrs próprios: quem chamou pode mexer neles sem tocar no cache
+        df = df.copy(deep=False)
+        metricas().registrar(funcao.__name__, database_name, time.perf_counter() - inicio, situacao)
+        return df
+
+    def atualizar(*args, **kwargs):
+        cache_resultados().guardar(chave_de(args, kwargs), calcular(args, kwargs))
+
+    envolvida.atualizar = atualizar
+    return envolvida
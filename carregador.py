@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from metricas import metricas
+from regioes import REGIOES
+
+
+# Etapas reportadas por banco() durante uma consulta sem cache: as das
+# vendas, de diario(), e as dos clientes, de clientes()
+ETAPAS = (
+    'vendas: conexão', 'vendas: consulta', 'vendas: tratamento',
+    'clientes: conexão', 'clientes: consulta', 'clientes: tratamento',
+)
+
+
+# Pool de threads compartilhado entre reruns e sessões
+@st.cache_resource
+def _executor():
+    return ThreadPoolExecutor(max_workers=len(REGIOES) * 4, thread_name_prefix='banco')
+
+
+class Carga:
+    """Consulta de todas as regiões disparada ao mesmo tempo.
+
+    A função recebe o database como primeiro argumento e um callback
+    `_progresso(database, etapa)`, chamado ao fim de cada etapa da consulta.
+    Se o resultado vier do cache a função retorna sem chamar o callback e a
+    região conta como concluída de uma vez.
+    """
+
+    def __init__(self, funcao, regioes, *args, **kwargs):
+        self._lock = threading.Lock()
+        self._etapas = {regiao.database: 0 for regiao in regioes}
+        self._consultados = set()
+        self.latencias = {}
+        self.inicio = time.monotonic()
+
+        # As threads não recebem o contexto da sessão: a função não pode usar
+        # comandos nem caches do Streamlit, só os caches próprios do módulo dados
+        def tarefa(database):
+            return funcao(database, *args, _progresso=self._etapa, **kwargs)
+
+        executor = _executor()
+        self._futuros = {}
+        for regiao in regioes:
+            futuro = executor.submit(tarefa, regiao.database)
+            futuro.add_done_callback(lambda futuro, database=regiao.database: self._concluir(database, futuro))
+            self._futuros[regiao.database] = (futuro, self.inicio + regiao.timeout)
+
+    def _etapa(self, database, etapa):
+        with self._lock:
+            self._etapas[database] = min(self._etapas[database] + 1, len(ETAPAS))
+            self._consultados.add(database)
+
+    def _concluir(self, database, futuro):
+        with self._lock:
+            self._etapas[database] = len(ETAPAS)
+            self.latencias[database] = time.monotonic() - self.inicio
+        if futuro.exception() is None:
+            metricas().registrar('banco', database, self.latencias[database], self.cache(database))
+
+    def cache(self, database):
+        """"hit" se a região veio toda do cache, "miss" se consultou o banco."""
+        with self._lock:
+            return 'miss' if database in self._consultados else 'hit'
+
+    def fracao(self):
+        """Fração das etapas já concluídas, entre 0 e 1."""
+        with self._lock:
+            return sum(self._etapas.values()) / (len(ETAPAS) * len(self._etapas))
+
+    def aguardar(self, database, ao_esperar=None, intervalo=0.1):
+        """Bloqueia até o resultado da região chegar ou o prazo dela acabar.
+
+        `ao_esperar` é chamado a cada `intervalo` segundos de espera.
+        Levanta TimeoutError quando o prazo é ultrapassado, ou o erro da
+        própria consulta, que também pode ser um TimeoutError (consulta
+        cancelada, pool sem conexão livre) com a sua causa na mensagem.
+        """
+        futuro, prazo = self._futuros[database]
+        while True:
+            restante = prazo - time.monotonic()
+            try:
+                return futuro.result(timeout=max(0, min(intervalo, restante)))
+            except TimeoutError:
+                if futuro.done():
+                    raise
+                if time.monotonic() >= prazo:
+                    raise TimeoutError(f"o banco não respondeu em {prazo - self.inicio:.0f} segundos") from None
+                if ao_esperar is not None:
+                    ao_esperar()
+
+    def resultados(self):
+        """DataFrames das regiões que já terminaram sem erro, por database."""
+        return {
+            database: futuro.result()
+            for database, (futuro, _) in self._futuros.items()
+            if futuro.done() and futuro.exception() is None
+        }
+
+    def aguardar_todas(self, ao_esperar=None, intervalo=0.1):
+        """Espera todas as regiões terminarem ou estourarem o prazo.
+
+        Os erros não são levantados aqui; cada região os mostra ao chamar
+        aguardar() para si.
+        """
+        for database in self._futuros:
+            try:
+                self.aguardar(database, ao_esperar, intervalo)
+            except Exception:
+                pass
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import pyodbc
+import streamlit as st
+
+
+# Definir LD_LIBRARY_PATH para ambiente Linux
+os.environ['LD_LIBRARY_PATH'] = '/opt/microsoft/msodbcsql17/lib64:/usr/lib/x86_64-linux-gnu'
+
+# Pasta com réplicas SQLite geradas por sintetico.py; quando definida, as
+# consultas vão para <pasta>/<database>.sqlite e não para o SQL Server
+BANCO_LOCAL = os.environ.get('BANCO_LOCAL')
+
+# Na réplica local as datas ficam em texto ISO, que ordena como data
+sqlite3.register_adapter(date, date.isoformat)
+
+# Erros de driver que invalidam a conexão, do SQL Server ou da réplica local
+ERROS_BANCO = (pyodbc.Error, sqlite3.Error)
+
+
+class PoolConexoes:
+    """Conexões pyodbc reaproveitadas entre consultas ao mesmo banco.
+
+    No máximo `tamanho` conexões ficam emprestadas ao mesmo tempo. Antes de
+    emprestar, a conexão passa por um `SELECT 1`; se estiver morta é
+    descartada e outra é aberta. Conexões paradas há mais de `ocioso`
+    segundos são fechadas por uma thread de limpeza.
+    """
+
+    def __init__(self, conectar, tamanho=4, ocioso=300, espera=60):
+        self._conectar = conectar
+        self._ocioso = ocioso
+        self._espera = espera
+        self._vagas = threading.BoundedSemaphore(tamanho)
+        self._lock = threading.Lock()
+        self._livres = []  # (conexão, instante da devolução)
+
+        limpeza = threading.Thread(target=self._limpar_periodicamente, daemon=True, name='pool-limpeza')
+        limpeza.start()
+
+    @contextmanager
+    def conexao(self):
+        if not self._vagas.acquire(timeout=self._espera):
+            raise TimeoutError(f"Nenhuma conexão livre após {self._espera} segundos")
+        try:
+            connection = self._emprestar()
+            try:
+                yield connection
+            except BaseException:
+                # A conexão pode ter ficado em estado inválido (erro do driver,
+                # consulta cancelada no meio); não volta ao pool
+                self._fechar(connection)
+                raise
+            else:
+                with self._lock:
+                    self._livres.append((connection, time.monotonic()))
+        finally:
+            self._vagas.release()
+
+    def despejar_ociosas(self):
+        limite = time.monotonic() - self._ocioso
+        with self._lock:
+            ociosas = [connection for connection, devolvida in self._livres if devolvida < limite]
+            self._livres = [(connection, devolvida) for connection, devolvida in self._livres if devolvida >= limite]
+        for connection in ociosas:
+            self._fechar(connection)
+
+    def _emprestar(self):
+        while True:
+            with self._lock:
+                if not self._livres:
+                    break
+                connection, _ = self._livres.pop()
+            if self._saudavel(connection):
+                return connection
+            self._fechar(connection)
+        return self._conectar()
+
+    def _limpar_periodicamente(self):
+        while True:
+            time.sleep(max(self._ocioso / 2, 1))
+            self.despejar_ociosas()
+
+    @staticmethod
+    def _saudavel(connection):
+        try:
+            connection.cursor().execute('SELECT 1').fetchone()
+            return True
+        except ERROS_BANCO:
+            return False
+
+    @staticmethod
+    def _fechar(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+# Um pool por banco, compartilhado entre reruns e sessões. Fica no módulo e
+# não em st.cache_resource porque é usado pelas threads de carga, que não têm
+# contexto de sessão do Streamlit
+_pools = {}
+_lock_pools = threading.Lock()
+
+
+def pool(database_name):
+    with _lock_pools:
+        if database_name not in _pools:
+            _pools[database_name] = PoolConexoes(conector(database_name))
+        return _pools[database_name]
+
+
+def cancelar(connection, cursor):
+    """Cancela, de outra thread, o comando em andamento no cursor."""
+    # pyodbc manda o cancelamento ao SQL Server (SQLCancel); o sqlite3 só
+    # sabe interromper pela conexão
+    if hasattr(cursor, 'cancel'):
+        cursor.cancel()
+    else:
+        connection.interrupt()
+
+
+def conector(database_name):
+    """Função sem argumentos que abre uma conexão nova com o banco."""
+    if BANCO_LOCAL:
+        caminho = os.path.join(BANCO_LOCAL, f'{database_name}.sqlite')
+        # A conexão passa de uma thread de carga para outra pelo pool
+        return lambda: sqlite3.connect(caminho, check_same_thread=False)
+    conn_str = _conn_str(database_name)
+    return lambda: pyodbc.connect(conn_str)
+
+
+def _conn_str(database_name):
+    server = st.secrets["db_server"]
+    username = st.secrets["db_username"]
+    password = st.secrets["db_password"]
+
+    # String de conexão
+    conn_str = f'DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server},1433;DATABASE={database_name};UID={username};PWD={password};Timeout=30'
+
+    return conn_str
@@ -0,0 +1,372 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import streamlit as st
+
+import leitura
+import snapshot
+from cache_resultados import cache_resultados, em_cache
+from conexao import ERROS_BANCO, cancelar, pool
+from disjuntor import disjuntor
+from formatacao import nome_do_mes
+from metricas import metricas
+from regioes import regiao_do_banco
+
+
+# "erp" consulta os bancos; "snapshot" lê só os arquivos gerados por snapshot.py
+FONTE_DADOS = os.environ.get('FONTE_DADOS', 'erp')
+
+# Seções oferecidas no dashboard; banco() traz todas numa só consulta
+SECOES = ('FINI', 'BELLAVANA', 'RICLAN')
+
+# Colunas devolvidas por banco(), usadas quando uma região não responde
+COLUNAS_BANCO = ['Ano', 'Mês', 'Seção', 'Faturamento', 'Positivação', 'Banco de Dados']
+
+
+def _secoes(secao):
+    return (secao,) if isinstance(secao, str) else tuple(secao)
+
+
+def _anos(ano):
+    return (str(ano).strip(),) if isinstance(ano, (str, int)) else tuple(str(a).strip() for a in ano)
+
+
+def _marcadores(valores):
+    return ', '.join('?' * len(valores))
+
+
+# Os frames em cache guardam rótulos repetidos como categóricos e contagens
+# em inteiros estreitos; os textos formatados só são montados na tela
+def _compactar(df, database_name):
+    df['Ano'] = df['Ano'].astype('int16')
+    df['Seção'] = df['Seção'].astype('category')
+    df['Banco de Dados'] = pd.Series(database_name, index=df.index, dtype='category')
+    return df
+
+
+def _filtros(database_name, ano, secao, desde=None, ate=None):
+    """Trecho FROM/WHERE comum às consultas e os parâmetros na ordem dos ?.
+
+    Todos os valores vão como parâmetros (?), então o texto da consulta só
+    muda com a quantidade de anos, seções e regiões, e o SQL Server
+    reaproveita o plano de execução.
+    """
+    anos = [int(a) for a in _anos(ano)]
+    secoes = list(_secoes(secao))
+    es_regiao = list(regiao_do_banco(database_name).es_regiao)
+
+    filtro_data = ''
+    datas = []
+    if desde is not None:
+        filtro_data += 'AND a.vd_data_venda >= ?'
+        datas.append(desde)
+    if ate is not None:
+        filtro_data += ' AND a.vd_data_venda < ?'
+        datas.append(ate)
+
+    origem = f"""
+    FROM         
+        t_calendar cal
+    INNER JOIN
+        t_vendas a ON a.vd_data_venda = cal.cal_data
+    INNER JOIN 
+        t_vendas_itens b ON a.vd_codigo = b.vd_codigo
+    INNER JOIN
+        t_produtos c ON c.pr_codigo = b.pr_codigo
+    INNER JOIN 
+        t_produtos_class d ON c.pc_codigo = d.pc_codigo
+    INNER JOIN 
+        t_clientes e ON a.cl_codigo = e.cl_codigo
+    INNER JOIN
+        t_estrutura f ON a.es_id = f.es_id
+    WHERE
+        cal.cal_ano IN ({_marcadores(anos)})
+        AND a.vd_status <> 12
+        AND a.vd_bonif = 0
+        AND d.pc_secao_descr_ IN ({_marcadores(secoes)})
+        AND a.vd_data_venda = cal.cal_data
+        {filtro_data}
+        AND f.es_regiao IN ({_marcadores(es_regiao)})
+        AND e.tp_status = 1 -- Certifica-se de contar apenas os clientes ativos	
+"""
+    return origem, anos + secoes + datas + es_regiao
+
+
+def _ler(database_name, query, params):
+    # Banco que vem falhando não é chamado até o disjuntor liberar
+    circuito = disjuntor(database_name)
+    circuito.verificar()
+    try:
+        df = _executar(database_name, query, params)
+    except Exception:
+        # Qualquer erro conta, senão uma chamada de teste que falhe de outro
+        # jeito deixaria o circuito preso esperando o resultado dela
+        circuito.falha()
+        raise
+    circuito.sucesso()
+    return df
+
+
+def _executar(database_name, query, params):
+    # Pega uma conexão do pool do banco e lê o resultado em lotes colunares
+    limite = regiao_do_banco(database_name).timeout_consulta
+    inicio = time.perf_counter()
+    with pool(database_name).conexao() as connection:
+        metricas().registrar('conexão', database_name, time.perf_counter() - inicio)
+        cursor = connection.cursor()
+
+        # Passado o limite o comando é cancelado no servidor; o driver levanta
+        # erro, a conexão sai do pool e a thread de carga fica livre
+        cancelada = threading.Event()
+
+        def cancelar_consulta():
+            cancelada.set()
+            cancelar(connection, cursor)
+
+        relogio = threading.Timer(limite, cancelar_consulta)
+        relogio.daemon = True
+        relogio.start()
+        try:
+            with metricas().medir('execução', database_name):
+                cursor.execute(query, params)
+            with metricas().medir('leitura', database_name):
+                return leitura.dataframe(cursor)
+        except ERROS_BANCO as erro:
+            if cancelada.is_set():
+                raise TimeoutError(f"consulta cancelada após {limite:.0f} segundos") from erro
+            raise
+        finally:
+            relogio.cancel()
+            cursor.close()
+
+
+def sql_vendas(database_name, ano, secao, desde=None, ate=None):
+    """Texto e parâmetros da consulta de consultar()."""
+    origem, params = _filtros(database_name, ano, secao, desde, ate)
+    query = f"""
+    SELECT 
+        cal.cal_ano AS 'Ano', 
+        cal.cal_mes AS 'Mês', 
+        d.pc_secao_descr_ AS 'Seção',
+        a.vd_data_venda AS 'Data',
+        COALESCE(SUM(b.vi_qtd * b.vi_valorunit), 0) AS 'Faturamento',	
+        COUNT(DISTINCT(a.cl_codigo)) AS 'Positivação'
+    {origem}
+    GROUP BY 
+        cal.cal_ano, cal.cal_mes, d.pc_secao_descr_, a.vd_data_venda
+    ORDER BY
+        Ano, Mês, Seção, Data;
+"""
+    return query, params
+
+
+def sql_clientes(database_name, ano, secao, desde=None, ate=None):
+    """Texto e parâmetros da consulta de consultar_clientes()."""
+    origem, params = _filtros(database_name, ano, secao, desde, ate)
+    query = f"""
+    SELECT DISTINCT
+        cal.cal_ano AS 'Ano', 
+        cal.cal_mes AS 'Mês', 
+        d.pc_secao_descr_ AS 'Seção',
+        a.cl_codigo
+    {origem}
+"""
+    return query, params
+
+
+def consultar(database_name, ano, secao, desde=None, ate=None):
+    """Agrega as vendas por dia e seção, opcionalmente só no intervalo [desde, ate)."""
+    return _ler(database_name, *sql_vendas(database_name, ano, secao, desde, ate))
+
+
+def consultar_clientes(database_name, ano, secao, desde=None, ate=None):
+    """Clientes distintos que compraram em cada mês e seção, no mesmo recorte de consultar()."""
+    return _ler(database_name, *sql_clientes(database_name, ano, secao, desde, ate))
+
+
+# Os meses antes do mês corrente não mudam mais; a entrada fica no cache de
+# resultados, dentro do limite de memória e visível na administração, e vence
+# na virada do mês, quando o mês corrente passa a ser fechado também
+def _meses_fechados(consulta, database_name, ano, secao, inicio_mes):
+    chave = (f'{consulta.__name__}:fechados', database_name, ano, secao)
+    df = cache_resultados().obter(chave)
+    if df is None:
+        df = consulta(database_name, ano, secao, ate=inicio_mes)
+        proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+        cache_resultados().guardar(chave, df, expira=datetime(proximo_mes.year, proximo_mes.month, 1).timestamp())
+    return df
+
+
+def _buscar(consulta, tipo, database_name, ano, secao, _progresso=None):
+    """Roda `consulta` no ERP, ou lê o snapshot `tipo` quando FONTE_DADOS=snapshot."""
+    hoje = date.today()
+    if FONTE_DADOS == 'snapshot':
+        if _progresso:
+            _progresso(database_name, f'{tipo}: conexão')
+        df = snapshot.ler(database_name, ano, secao, tipo=tipo)
+    elif str(hoje.year) in ano:
+        # Ano aberto: só o mês corrente é consultado de novo a cada
+        # atualização, e é juntado aos meses fechados já em cache
+        inicio_mes = hoje.replace(day=1)
+        fechados = _meses_fechados(consulta, database_name, ano, secao, inicio_mes)
+        if _progresso:
+            _progresso(database_name, f'{tipo}: conexão')
+        aberto = consulta(database_name, str(hoje.year), secao, desde=inicio_mes)
+        df = pd.concat([fechados, aberto], ignore_index=True)
+    else:
+        if _progresso:
+            _progresso(database_name, f'{tipo}: conexão')
+        df = consulta(database_name, ano, secao)
+    if _progresso:
+        _progresso(database_name, f'{tipo}: consulta')
+    return df
+
+
+# conexão com o banco de dados
+@em_cache
+def diario(database_name, ano, secao=SECOES, _progresso=None):
+    """Faturamento e positivação por dia de um ou vários anos e seções.
+
+    A visão mensal de banco() e o detalhamento diário da tela saem deste
+    mesmo resultado, sem outra consulta de vendas ao ERP.
+    """
+    df = _buscar(consultar, 'vendas', database_name, _anos(ano), _secoes(secao), _progresso)
+    with metricas().medir('tratamento', database_name):
+        df = tratar_diario(df, database_name)
+
+    if _progresso:
+        _progresso(database_name, 'vendas: tratamento')
+
+    return df
+
+
+def tratar_diario(df, database_name):
+    df['Mês'] = nome_do_mes(df['Mês'])
+    df['Data'] = pd.to_datetime(df['Data'])
+    df['Positivação'] = df['Positivação'].astype('int32')
+    return _compactar(df, database_name)
+
+
+@em_cache
+def clientes(database_name, ano, secao=SECOES, _progresso=None):
+    """Conjunto exato de clientes positivados em cada (ano, mês, seção).
+
+    Os conjuntos mensais se juntam em memória para contar clientes distintos
+    em qualquer período com clientes_distintos(), sem nova consulta.
+    """
+    df = _buscar(consultar_clientes, 'clientes', database_name, _anos(ano), _secoes(secao), _progresso)
+    with metricas().medir('tratamento', database_name):
+        df = tratar_clientes(df, database_name)
+
+    if _progresso:
+        _progresso(database_name, 'clientes: tratamento')
+
+    return df
+
+
+def tratar_clientes(df, database_name):
+    df['Trimestre'] = ((df['Mês'] - 1) // 3 + 1).astype('int8')
+    df['Mês'] = nome_do_mes(df['Mês'])
+    df['cl_codigo'] = pd.to_numeric(df['cl_codigo'], downcast='integer')
+    return _compactar(df, database_name)
+
+
+def banco(database_name, ano, secao=SECOES, _progresso=None):
+    """Faturamento e positivação por mês de um ou vários anos e seções.
+
+    Somado em memória a partir de diario() e clientes(), que ficam em
+    cache. Com listas de anos e seções vem tudo numa consulta só, e a tela
+    filtra o que foi escolhido com fatiar().
+    """
+    dias = diario(database_name, ano, secao, _progresso=_progresso)
+    ativos = clientes(database_name, ano, secao, _progresso=_progresso)
+    return mensal(dias, ativos, database_name)
+
+
+def mensal(dias, ativos, database_name):
+    """Soma os frames de diario() e clientes() no formato de banco()."""
+    chaves = ['Ano', 'Mês', 'Seção']
+    df = dias.groupby(chaves, observed=True)[['Faturamento']].sum()
+    # Positivação do mês: clientes distintos no mês, e não a soma dos
+    # distintos de cada dia, que conta duas vezes quem comprou em dias diferentes
+    df['Positivação'] = ativos.groupby(chaves, observed=True).size()
+    df['Positivação'] = df['Positivação'].fillna(0).astype('int32')
+    df = df.reset_index()
+
+    # Idade dos dados: a do mais velho dos dois, e antigo se um deles for
+    datas = [frame.attrs['dados_de'] for frame in (dias, ativos) if 'dados_de' in frame.attrs]
+    if datas:
+        df.attrs['dados_de'] = min(datas)
+    df.attrs['antigo'] = bool(dias.attrs.get('antigo') or ativos.attrs.get('antigo'))
+
+    # Adiciona uma coluna com o nome do banco de dados
+    df['Banco de Dados'] = pd.Series(database_name, index=df.index, dtype='category')
+
+    return df
+
+
+def fatiar(df, secao, ano=None):
+    """Linhas de uma seção (e opcionalmente de um ano) de banco() ou diario()."""
+    filtro = df['Seção'] == secao
+    if ano is not None:
+        filtro &= df['Ano'] == int(ano)
+    return df[filtro].reset_index(drop=True)
+
+
+def clientes_distintos(ativos, por=()):
+    """Clientes distintos por grupo a partir de um ou mais frames de clientes().
+
+    `por` são as colunas do grupo, por exemplo ['Trimestre'] ou ['Ano', 'Mês'];
+    sem colunas devolve o total. Cada filial tem o seu próprio cadastro, então
+    um cliente é identificado por (banco, código).
+    """
+    identidade = ['Banco de Dados', 'cl_codigo']
+    unicos = ativos.drop_duplicates([*por, *identidade])
+    if not por:
+        return len(unicos)
+    return unicos.groupby(list(por), observed=True).size()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def consolidar(frames):
+    """Totais mensais da rede e participação de cada região no faturamento.
+
+    `frames` é {nome da região: DataFrame de fatiar()}. Como o resultado fica
+    em cache pelo hash dos frames, ele é recalculado sozinho quando qualquer
+    região é atualizada, sem nenhuma consulta a mais ao ERP.
+    """
+    todos = pd.concat(frames, names=['Região', None]).reset_index(level='Região')
+
+    totais = todos.groupby('Mês', observed=True)[['Faturamento', 'Positivação']].sum().reset_index()
+
+    participacao = todos.groupby(['Mês', 'Região'], observed=True)['Faturamento'].sum().reset_index()
+    participacao['Participação'] = (
+        participacao['Faturamento'] / participacao.groupby('Mês', observed=True)['Faturamento'].transform('sum') * 100
+    )
+    return totais, participacao
+
+
+def comparar_anos(df, ano, ano_base):
+    """Faturamento e positivação mês a mês de `ano` contra `ano_base`.
+
+    As colunas de variação estão em porcentagem e ficam vazias nos meses
+    sem valor no ano base.
+    """
+    ano, ano_base = int(ano), int(ano_base)
+    if ano == ano_base:
+        raise ValueError(f"Comparação de {ano} com ele mesmo")
+    medidas = ['Faturamento', 'Positivação']
+    tabela = df.pivot_table(index='Mês', columns='Ano', values=medidas, aggfunc='sum', observed=False, fill_value=0)
+    tabela = tabela.reindex(columns=pd.MultiIndex.from_product([medidas, [ano_base, ano]]), fill_value=0)
+
+    comparativo = pd.DataFrame(index=tabela.index)
+    for medida in medidas:
+        base = tabela[(medida, ano_base)]
+        atual = tabela[(medida, ano)]
+        comparativo[f'{medida} {ano_base}'] = base
+        comparativo[f'{medida} {ano}'] = atual
+        comparativo[f'Variação {medida}'] = (atual - base) / base.where(base != 0) * 100
+    return comparativo.reset_index()
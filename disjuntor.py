@@ -0,0 +1,71 @@
+"""Disjuntor (circuit breaker) por banco do ERP.
+
+Depois de `limite` falhas seguidas o banco deixa de ser consultado por
+`espera` segundos e as chamadas falham na hora com CircuitoAberto, em vez
+de prender a página esperando um banco que já se sabe fora do ar.
+"""
+import threading
+import time
+
+
+class CircuitoAberto(Exception):
+    def __init__(self, database_name, segundos):
+        super().__init__(f"{database_name} falhou seguidamente; nova tentativa em {segundos:.0f} segundos")
+        self.database_name = database_name
+
+
+class Disjuntor:
+    """Conta falhas seguidas de um banco e abre o circuito no limite.
+
+    Passada a espera deixa passar uma única chamada de teste: se ela der
+    certo o circuito fecha; se falhar, abre de novo por mais `espera`
+    segundos.
+    """
+
+    def __init__(self, database_name, limite=3, espera=120):
+        self._database_name = database_name
+        self._limite = limite
+        self._espera = espera
+        self._lock = threading.Lock()
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._testando = False
+
+    def verificar(self):
+        """Levanta CircuitoAberto se o banco não deve ser chamado agora."""
+        with self._lock:
+            if self._falhas < self._limite:
+                return
+            restante = self._aberto_ate - time.monotonic()
+            if restante > 0 or self._testando:
+                raise CircuitoAberto(self._database_name, max(restante, 0))
+            self._testando = True
+
+    def sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._testando = False
+
+    def falha(self):
+        with self._lock:
+            self._falhas += 1
+            self._testando = False
+            if self._falhas >= self._limite:
+                self._aberto_ate = time.monotonic() + self._espera
+
+    @property
+    def aberto(self):
+        with self._lock:
+            return self._falhas >= self._limite
+
+
+# Um disjuntor por banco, compartilhado pelas sessões e threads do processo
+_disjuntores = {}
+_lock_disjuntores = threading.Lock()
+
+
+def disjuntor(database_name):
+    with _lock_disjuntores:
+        if database_name not in _disjuntores:
+            _disjuntores[database_name] = Disjuntor(database_name)
+        return _disjuntores[database_name]
@@ -0,0 +1,152 @@
+"""Exportação dos resultados de banco() em CSV, Parquet ou Excel.
+
+Os arquivos saem dos DataFrames já em cache, sem nova consulta ao ERP, e
+são escritos lote a lote: em nenhum momento existe uma segunda cópia
+inteira dos dados em memória, só o lote da vez. Pelo terminal, para jobs
+agendados:
+
+    python exportacao.py 2023 2024 --formato parquet --saida vendas.parquet
+
+Com CACHE_DIR apontando para o cache em disco do dashboard, a linha de
+comando reaproveita o que as sessões já carregaram.
+"""
+import argparse
+import io
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Linhas escritas de cada vez
+LOTE = 50_000
+
+# Colunas exportadas; os textos formatados para a tela ficam de fora
+COLUNAS = ['Região', 'Banco de Dados', 'Ano', 'Mês', 'Seção', 'Faturamento', 'Positivação']
+
+# Acima disto o arquivo gerado para download vai para o disco
+MEMORIA_MAXIMA = 16 * 1024 * 1024
+
+# Tipos das colunas do Parquet quando não há nenhuma linha: sem lote não há
+# DataFrame de onde tirar o esquema, e um arquivo sem esquema não é Parquet
+ESQUEMA_VAZIO = pa.schema([
+    ('Região', pa.string()),
+    ('Banco de Dados', pa.string()),
+    ('Ano', pa.int16()),
+    ('Mês', pa.string()),
+    ('Seção', pa.string()),
+    ('Faturamento', pa.float64()),
+    ('Positivação', pa.int32()),
+])
+
+FORMATOS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def formatos_disponiveis():
+    """Formatos que dá para gerar neste ambiente; Excel depende do openpyxl."""
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return [formato for formato in FORMATOS if formato != 'Excel']
+    return list(FORMATOS)
+
+
+def _lotes(frames):
+    # frames é {nome da região: DataFrame de banco()}
+    for regiao, df in frames.items():
+        for inicio in range(0, len(df), LOTE):
+            lote = df.iloc[inicio:inicio + LOTE]
+            yield lote.assign(**{'Região': regiao})[COLUNAS]
+
+
+def _csv(frames, destino):
+    # ; e vírgula decimal: abre direto no Excel em português
+    texto = io.TextIOWrapper(destino, encoding='utf-8-sig', newline='', write_through=True)
+    cabecalho = True
+    for lote in _lotes(frames):
+        lote.to_csv(texto, sep=';', decimal=',', index=False, header=cabecalho)
+        cabecalho = False
+    if cabecalho:
+        texto.write(';'.join(COLUNAS) + '\n')
+    texto.detach()
+
+
+def _parquet(frames, destino):
+    escritor = None
+    try:
+        for lote in _lotes(frames):
+            tabela = pa.Table.from_pandas(lote.astype({'Mês': str}), preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(destino, tabela.schema)
+            escritor.write_table(tabela.cast(escritor.schema))
+        if escritor is None:
+            pq.write_table(ESQUEMA_VAZIO.empty_table(), destino)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _excel(frames, destino):
+    from openpyxl import Workbook
+
+    # write_only grava as linhas à medida que chegam, sem montar a planilha em memória
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet('Vendas')
+    aba.append(COLUNAS)
+    for lote in _lotes(frames):
+        for linha in lote.astype({'Mês': str}).itertuples(index=False, name=None):
+            aba.append(linha)
+    planilha.save(destino)
+
+
+_ESCRITORES = {'CSV': _csv, 'Parquet': _parquet, 'Excel': _excel}
+
+
+def escrever(frames, formato, destino):
+    """Grava os frames de banco() no arquivo binário `destino`, lote a lote."""
+    _ESCRITORES[formato](frames, destino)
+
+
+def gerar(frames, formato):
+    """Bytes do arquivo exportado, para st.download_button.
+
+    O download do Streamlit guarda sempre o arquivo pronto em bytes; até
+    lá a escrita vai para um temporário que passa para o disco se crescer.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=MEMORIA_MAXIMA) as arquivo:
+        escrever(frames, formato, arquivo)
+        arquivo.seek(0)
+        return arquivo.read()
+
+
+def main():
+    from dados import SECOES, banco, fatiar
+    from regioes import REGIOES
+
+    parser = argparse.ArgumentParser(description="Exporta faturamento e positivação mensais das regiões.")
+    parser.add_argument('anos', nargs='+')
+    parser.add_argument('--formato', choices=[formato.lower() for formato in FORMATOS], default='csv')
+    parser.add_argument('--saida', required=True, help="arquivo de destino")
+    parser.add_argument('--secao', choices=SECOES, help="só uma seção (padrão: todas)")
+    parser.add_argument('--bancos', nargs='+', help="só estes bancos (padrão: todas as regiões)")
+    args = parser.parse_args()
+
+    formato = next(formato for formato in FORMATOS if formato.lower() == args.formato)
+    frames = {}
+    for regiao in REGIOES:
+        if args.bancos and regiao.database not in args.bancos:
+            continue
+        df = banco(regiao.database, sorted(args.anos))
+        frames[regiao.nome] = fatiar(df, args.secao) if args.secao else df
+
+    with open(args.saida, 'wb') as destino:
+        escrever(frames, formato, destino)
+    print(f"{sum(len(df) for df in frames.values())} linhas em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Formatação em português sem depender do locale global do processo.
+
+locale.setlocale vale para o processo inteiro e não é seguro com várias
+sessões carregando dados em threads; aqui tudo é feito com operações
+vetorizadas do pandas.
+"""
+import numpy as np
+import pandas as pd
+
+
+MESES = ['janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho', 'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro']
+
+
+def nome_do_mes(numeros):
+    """Converte números de mês (1 a 12) no categórico ordenado de MESES."""
+    return pd.Categorical.from_codes(np.asarray(numeros, dtype='int64') - 1, categories=MESES, ordered=True)
+
+
+def formatar_numero(valores, casas=2):
+    """Formata no padrão brasileiro: 1234567.891 -> '1.234.567,89'."""
+    valores = pd.Series(valores, dtype='float64')
+    escala = 10 ** casas
+    total = np.round(valores.abs() * escala).astype('int64')
+    inteiro = (total // escala).astype(str).str.replace(r'\B(?=(\d{3})+(?!\d))', '.', regex=True)
+    sinal = pd.Series(np.where((valores < 0) & (total > 0), '-', ''), index=valores.index)
+    if casas == 0:
+        return sinal + inteiro
+    decimal = (total % escala).astype(str).str.zfill(casas)
+    return sinal + inteiro + ',' + decimal
+
+
+def formatar_real(valores):
+    """Formata valores em reais: 1234.5 -> 'R$ 1.234,50'."""
+    return 'R$ ' + formatar_numero(valores)
@@ -0,0 +1,167 @@
+"""Gráficos de uma região: pizza de faturamento, legenda, linha e positivação.
+
+A montagem de cada gráfico fica em cache pelo hash do DataFrame da região,
+então reruns causados por outros widgets reaproveitam a figura Plotly e a
+especificação Vega-Lite já prontas.
+"""
+import altair as alt
+import plotly.graph_objects as go
+import streamlit as st
+
+from formatacao import formatar_numero, formatar_real
+
+
+# Definindo manualmente as cores para cada fatia do gráfico
+CORES = [
+    "#636EFA", "#EF553B", "#00CC96", "#AB63FA",
+    "#FFA15A", "#19D3F3", "#FF6692", "#B6E880",
+    "#FF97FF", "#FECB52", "#AADEA7", "#EB89B5"
+]
+
+# Regiões x anos x seções mantidos em cache ao mesmo tempo
+_MAXIMO_GRAFICOS = 256
+
+
+# A figura não é alterada pelo st.plotly_chart, então pode ser compartilhada
+@st.cache_resource(show_spinner=False, max_entries=_MAXIMO_GRAFICOS)
+def pizza(df):
+    labels = df['Mês']
+    values = df['Faturamento']
+
+    # Personalização do gráfico
+    fig = go.Figure(data=[go.Pie(
+        labels=labels,
+        values=values,
+        hole=0.3,
+        pull=[0.1] * len(labels),
+        textinfo='label+percent',  # Inclui os nomes dos meses e os percentuais dentro do gráfico
+        marker=dict(colors=CORES)  # Aplicando as cores manualmente
+    )])
+
+    # Configurando layout do gráfico
+    fig.update_layout(
+        margin=dict(l=0, r=0, t=30, b=30),
+        showlegend=False  # Desativa a legenda automática do gráfico
+    )
+
+    fig.update_layout(annotations=[dict(
+        text='Faturamento Mês',
+        x=0.5,
+        y=0.5,
+        font=dict(size=18, color='blue', family='Arial', weight='bold'),
+        showarrow=False
+    )])
+    return fig
+
+
+@st.cache_data(show_spinner=False, max_entries=_MAXIMO_GRAFICOS)
+def legenda(df):
+    # Legenda personalizada abaixo do gráfico em uma linha horizontal
+    legend_html = "<div style='display: flex; justify-content: center; flex-wrap: wrap;'>"
+    for color, mes, valor in zip(CORES, df['Mês'], formatar_real(df['Faturamento'])):
+        legend_html += f"<div style='margin: 5px; text-align: center;'><span style='color:{color}'>{mes.capitalize()}</span><br>{valor}</div>"
+    legend_html += "</div>"
+    return legend_html
+
+
+@st.cache_data(show_spinner=False, max_entries=_MAXIMO_GRAFICOS)
+def linha(df):
+    # O texto formatado só existe aqui, no gráfico; o frame em cache guarda só o número
+    df = df.assign(**{'Faturamento Formatado': formatar_numero(df['Faturamento'])})
+    grafico = alt.Chart(df).mark_line(
+        color='#000fff',
+    ).encode(
+        x='Mês',
+        y='Faturamento',
+    ).properties(height=460)
+    texto = grafico.mark_text(radius=20, size=16).encode(text='Faturamento Formatado')
+    return (grafico + texto).to_dict()
+
+
+@st.cache_data(show_spinner=False, max_entries=_MAXIMO_GRAFICOS)
+def positivacao(df):
+    grafico = alt.Chart(df).mark_bar(
+        color='#adcfff',
+        cornerRadiusTopLeft=9,
+        cornerRadiusTopRight=9,
+    ).encode(
+        x='Mês',
+        y='Positivação'
+    ).properties(height=460)
+
+    # Adiciona texto no gráfico
+    texto = grafico.mark_text(
+        radius=20,
+        size=14
+    ).encode(
+        text='Positivação'
+    )
+
+    # Combina o gráfico de barras com o texto
+    return alt.layer(
+        grafico,
+        texto
+    ).configure_axis(
+        grid=False  # Remove as linhas de grade de ambos os eixos
+    ).to_dict()
+
+
+@st.cache_data(show_spinner=False, max_entries=_MAXIMO_GRAFICOS)
+def participacao(df):
+    # Barras empilhadas de 0 a 100% com a fatia de cada região no mês
+    return alt.Chart(df).mark_bar().encode(
+        x='Mês',
+        y=alt.Y('Faturamento', stack='normalize', title='Participação no faturamento'),
+        color='Região',
+        tooltip=['Região', 'Mês', alt.Tooltip('Participação', format='.1f')],
+    ).properties(height=460).to_dict()
+
+
+@st.cache_data(show_spinner=False, max_entries=_MAXIMO_GRAFICOS)
+def diario(df):
+    # Barras de positivação e linha de faturamento por dia, com eixos próprios
+    base = alt.Chart(df).encode(x=alt.X('Data:T', title='Dia'))
+    barras = base.mark_bar(color='#adcfff').encode(y='Positivação')
+    linha_dia = base.mark_line(color='#000fff', point=True).encode(
+        y='Faturamento',
+        tooltip=[alt.Tooltip('Data:T', format='%d/%m/%Y'), 'Faturamento', 'Positivação'],
+    )
+    return alt.layer(barras, linha_dia).resolve_scale(y='independent').properties(height=360).to_dict()
+
+
+def renderizar(nome, df, dias=None):
+    """Desenha a pizza, a legenda e as colunas de estatística e positivação de uma região.
+
+    Com `dias` (o diario() da mesma região e seção) dá para escolher um mês
+    e ver a série diária dele. `df` já vem em ordem de mês: é o que sai do
+    groupby de banco() e de consolidar(), com Mês categórico ordenado.
+    """
+    # Exibindo o gráfico e a legenda personalizada abaixo dele
+    st.plotly_chart(pizza(df))
+    st.write(legenda(df), unsafe_allow_html=True)
+
+    st.markdown("___")
+
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        st.markdown(
+        f"<h3 style='text-align: center; font-size: 24px; color: #1a5fb8;'>Estatística {nome}</h3>",
+        unsafe_allow_html=True)
+        st.vega_lite_chart(spec=linha(df), use_container_width=True)
+
+    with col2:
+        st.markdown(
+        f"<h3 style='text-align: center; font-size: 24px; color: #1a5fb8;'>Positivação {nome}</h3>",
+        unsafe_allow_html=True)
+        st.vega_lite_chart(spec=positivacao(df), use_container_width=True)
+
+    if dias is None or df.empty:
+        return
+
+    mes = st.radio("Detalhar mês", df['Mês'].astype(str), index=None, horizontal=True, key=f"detalhe_{nome}")
+    if mes:
+        st.markdown(
+        f"<h3 style='text-align: center; font-size: 24px; color: #1a5fb8;'>Diário {nome} · {mes.capitalize()}</h3>",
+        unsafe_allow_html=True)
+        st.vega_lite_chart(spec=diario(dias[dias['Mês'] == mes]), use_container_width=True)
@@ -0,0 +1,46 @@
+"""Leitura dos resultados das consultas em lotes colunares.
+
+pd.read_sql_query busca todas as linhas como tuplas Python antes de montar
+o DataFrame, e o pico de memória cresce com o resultado inteiro em tuplas.
+Aqui o cursor é lido com fetchmany e cada lote vira um RecordBatch do
+pyarrow na hora, então só um lote existe como tuplas de cada vez. Funciona
+com qualquer cursor DB-API: pyodbc no ERP e sqlite3 nas réplicas locais.
+"""
+import pyarrow as pa
+
+
+# Linhas por fetchmany; grande o bastante para amortizar as idas ao driver
+TAMANHO_LOTE = 50_000
+
+
+def _coluna(valores):
+    coluna = pa.array(valores)
+    # O SQL Server devolve SUM de decimais como Decimal; vira float como no coerce_float do pandas
+    if pa.types.is_decimal(coluna.type):
+        coluna = coluna.cast(pa.float64())
+    return coluna
+
+
+def lotes(cursor, tamanho_lote=TAMANHO_LOTE):
+    """Gera um pyarrow.RecordBatch por fetchmany de um cursor já executado."""
+    nomes = [descricao[0] for descricao in cursor.description]
+    while True:
+        linhas = cursor.fetchmany(tamanho_lote)
+        if not linhas:
+            return
+        yield pa.RecordBatch.from_arrays([_coluna(valores) for valores in zip(*linhas)], names=nomes)
+
+
+def tabela(cursor, tamanho_lote=TAMANHO_LOTE):
+    """Resultado inteiro do cursor como pyarrow.Table."""
+    partes = [pa.Table.from_batches([lote]) for lote in lotes(cursor, tamanho_lote)]
+    if not partes:
+        nomes = [descricao[0] for descricao in cursor.description]
+        return pa.table({nome: pa.array([], pa.null()) for nome in nomes})
+    # Um lote só de nulos numa coluna vem com tipo null; promote acerta o tipo final
+    return pa.concat_tables(partes, promote_options='default')
+
+
+def dataframe(cursor, tamanho_lote=TAMANHO_LOTE):
+    """Resultado inteiro do cursor como DataFrame, montado a partir dos lotes."""
+    return tabela(cursor, tamanho_lote).to_pandas()
@@ -1,26 +1,44 @@
+import bcrypt
 import streamlit as st
-from PIL import Image
+
+import recursos
+import sessao
+
+# Hashes bcrypt das senhas; em produção a tabela vem de [usuarios] nos secrets
+USUARIOS = {
+    "charles": "$2b$12$oMfdBiYi.K68YT7hnarFzudMMTqRcFwCGntyYP9zEJ.FOXAQdMqQ2",
+    "Noam": "$2b$12$gaE4PH65dFmeWtZhMtARXu9eTfnCsIs9YToNShNbH9XCi/K7jivQC",
+    "Lael": "$2b$12$0zu3l6OaiCi3W0u33cAnE.B85nKo7OB/YILpFxgPGQDkc6oItXKje",
+}
+
+def _usuarios():
+    try:
+        return dict(st.secrets["usuarios"])
+    except (KeyError, FileNotFoundError):
+        return USUARIOS
+
+def administrador(usuario):
+    """Se o usuário vê o painel de administração: só os listados em `admins` nos secrets."""
+    try:
+        return usuario in st.secrets["admins"]
+    except (KeyError, FileNotFoundError):
+        return False
 
 def autenticar(usuario, senha):
-    usuarios_validos = {
-        "charles": "123",
-        "Noam": "123",
-        "Lael": "123"
-    }
+    usuarios_validos = _usuarios()
     if usuario not in usuarios_validos:
         return False, "Usuário inválido"
-    elif usuarios_validos[usuario] != senha:
+    elif not bcrypt.checkpw(senha.encode(), usuarios_validos[usuario].encode()):
         return False, "Senha inválida"
     else:
         return True, ""
 
-def render():
+def render(ao_entrar=None):
+    """Tela de login. `ao_entrar(usuario)` roda logo após o login, antes do rerun."""
 
-    with open("login.css") as f:    
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)  
+    st.markdown(recursos.estilo("login.css"), unsafe_allow_html=True)
 
-    logo = Image.open('logo.png')
-    st.image(logo, width=230)
+    st.image(recursos.logo(), width=230)
     
     faca_login = '''
     <div class="d-grid gap-2" >        
@@ -38,9 +56,9 @@ def render():
     if st.button("Entrar"):
         sucesso, mensagem = autenticar(usuario, senha)
         if sucesso:
-            st.session_state["autenticado"] = True
-            st.session_state["pagina"] = "Testes"
-            st.experimental_rerun()
+            sessao.entrar(usuario)
+            if ao_entrar is not None:
+                ao_entrar(usuario)
+            st.rerun()
         else:
-            st.session_state["autenticado"] = False
             st.error(mensagem)
@@ -0,0 +1,163 @@
+"""Tempos das etapas do dashboard por banco, com acerto ou falta de cache.
+
+Cada medição vai para um log estruturado (uma linha JSON por amostra) e
+para uma janela das últimas amostras de cada série, de onde saem p50 e p95
+para o painel de administração e para o arquivo de métricas no formato
+texto do Prometheus (METRICAS_ARQUIVO), lido pelo node_exporter.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+METRICAS_ARQUIVO = os.environ.get('METRICAS_ARQUIVO', os.path.join('metricas', 'vendas_fini.prom'))
+# Segundos mínimos entre duas gravações do arquivo; o coletor lê bem menos
+# que a cada rerun
+INTERVALO_EXPORTACAO = float(os.environ.get('METRICAS_INTERVALO', 10))
+
+# Amostras guardadas por série (etapa, banco, cache) para os percentis
+JANELA = 1024
+
+QUANTIS = (0.5, 0.95)
+
+# Orçamento, em segundos, até a tela (login ou barra lateral) estar pronta:
+# na primeira execução da tela no processo (fria) e nas seguintes (quente)
+ORCAMENTO_FRIA = float(os.environ.get('ORCAMENTO_FRIA', 5.0))
+ORCAMENTO_QUENTE = float(os.environ.get('ORCAMENTO_QUENTE', 0.5))
+
+logger = logging.getLogger('vendas_fini.metricas')
+if not logger.handlers:
+    _saida = logging.StreamHandler()
+    _saida.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_saida)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Metricas:
+    """Amostras de duração por (etapa, banco, cache), seguras entre threads.
+
+    `cache` é "hit" quando o resultado veio do cache e "miss" quando houve
+    consulta ao banco; nos marcos da página é "fria" ou "quente".
+    """
+
+    def __init__(self, janela=JANELA):
+        self._lock = threading.Lock()
+        self._janela = janela
+        self._amostras = {}
+        self._totais = {}  # série -> (soma dos segundos, quantidade) desde o início do processo
+        self._exportado = float('-inf')  # time.monotonic() da última gravação do arquivo
+
+    def registrar(self, etapa, banco, segundos, cache='miss'):
+        serie = (etapa, banco, cache)
+        with self._lock:
+            self._amostras.setdefault(serie, deque(maxlen=self._janela)).append(segundos)
+            soma, quantidade = self._totais.get(serie, (0.0, 0))
+            self._totais[serie] = (soma + segundos, quantidade + 1)
+        logger.info(json.dumps({
+            'ts': round(time.time(), 3), 'etapa': etapa, 'banco': banco,
+            'cache': cache, 'ms': round(segundos * 1000, 1),
+        }, ensure_ascii=False))
+
+    @contextmanager
+    def medir(self, etapa, banco, cache='miss'):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, banco, time.perf_counter() - inicio, cache)
+
+    def _series(self):
+        with self._lock:
+            return [(serie, np.array(amostras), self._totais[serie]) for serie, amostras in self._amostras.items()]
+
+    def resumo(self):
+        """p50 e p95 em ms de cada série, para o painel de administração."""
+        linhas = [
+            (*serie, quantidade, *np.quantile(amostras, QUANTIS) * 1000)
+            for serie, amostras, (_, quantidade) in self._series()
+        ]
+        colunas = ['Etapa', 'Banco', 'Cache', 'Amostras', 'p50 (ms)', 'p95 (ms)']
+        return pd.DataFrame(linhas, columns=colunas).sort_values(['Etapa', 'Banco', 'Cache']).round(1)
+
+    def texto_prometheus(self):
+        linhas = [
+            '# HELP vendas_fini_etapa_segundos Duração das etapas do dashboard por banco.',
+            '# TYPE vendas_fini_etapa_segundos summary',
+        ]
+        for (etapa, banco, cache), amostras, (soma, quantidade) in sorted(self._series(), key=lambda s: s[0]):
+            rotulos = f'etapa="{etapa}",banco="{banco}",cache="{cache}"'
+            for quantil, valor in zip(QUANTIS, np.quantile(amostras, QUANTIS)):
+                linhas.append(f'vendas_fini_etapa_segundos{{{rotulos},quantile="{quantil}"}} {valor:.6f}')
+            linhas.append(f'vendas_fini_etapa_segundos_sum{{{rotulos}}} {soma:.6f}')
+            linhas.append(f'vendas_fini_etapa_segundos_count{{{rotulos}}} {quantidade}')
+        return '\n'.join(linhas) + '\n'
+
+    def exportar(self, caminho=METRICAS_ARQUIVO, intervalo=INTERVALO_EXPORTACAO):
+        """Grava o arquivo de métricas, no máximo uma vez a cada `intervalo` segundos.
+
+        Uma falha ao gravar vai só para o log: o arquivo é do coletor e não
+        pode derrubar a página.
+        """
+        with self._lock:
+            agora = time.monotonic()
+            if agora - self._exportado < intervalo:
+                return
+            self._exportado = agora
+        try:
+            self._gravar(caminho)
+        except OSError as erro:
+            logger.warning(json.dumps({'alerta': 'métricas', 'arquivo': caminho, 'erro': str(erro)}, ensure_ascii=False))
+
+    def _gravar(self, caminho):
+        # Atômico: o coletor nunca lê o arquivo pela metade
+        pasta = os.path.dirname(caminho) or '.'
+        os.makedirs(pasta, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.prom.tmp')
+        try:
+            with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+                arquivo.write(self.texto_prometheus())
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.remove(temporario)
+            raise
+
+
+class Cronometro:
+    """Marcos de uma execução da página, em segundos desde `inicio`."""
+
+    def __init__(self, inicio):
+        self._inicio = inicio
+        self.marcos = {}
+
+    def marcar(self, nome):
+        self.marcos[nome] = time.perf_counter() - self._inicio
+
+    def relatar(self, marco_orcado, fria):
+        """Registra os marcos nas métricas e avisa se `marco_orcado` estourou o orçamento."""
+        execucao = 'fria' if fria else 'quente'
+        for nome, segundos in self.marcos.items():
+            _metricas.registrar(f'página: {nome}', 'app', segundos, execucao)
+        orcamento = ORCAMENTO_FRIA if fria else ORCAMENTO_QUENTE
+        gasto = self.marcos.get(marco_orcado)
+        if gasto is not None and gasto > orcamento:
+            logger.warning(json.dumps({
+                'alerta': 'orçamento', 'execucao': execucao, 'marco': marco_orcado,
+                'ms': round(gasto * 1000, 1), 'orcamento_ms': orcamento * 1000,
+            }, ensure_ascii=False))
+
+
+# Uma instância por processo, alimentada pelas threads de carga e pelas sessões
+_metricas = Metricas()
+
+
+def metricas():
+    return _metricas
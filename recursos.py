@@ -0,0 +1,22 @@
+"""Arquivos estáticos (logo, CSS) lidos do disco uma vez por processo.
+
+st.image recebe os bytes do PNG direto, sem decodificar com o PIL e
+recodificar a cada rerun.
+"""
+import streamlit as st
+
+
+@st.cache_resource(show_spinner=False)
+def conteudo(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+
+def logo():
+    return conteudo('logo.png')
+
+
+@st.cache_resource(show_spinner=False)
+def estilo(caminho):
+    """Bloco <style> com o CSS do arquivo, pronto para st.markdown."""
+    return f"<style>{conteudo(caminho).decode('utf-8')}</style>"
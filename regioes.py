@@ -0,0 +1,29 @@
+from dataclasses import dataclass
+
+
+# Cada filial da RJ Distribuidora tem o seu próprio banco no ERP
+@dataclass(frozen=True)
+class Regiao:
+    nome: str
+    titulo: str
+    database: str
+    timeout: float  # segundos de espera pela consulta antes de desistir da região
+    es_regiao: tuple  # valores de t_estrutura.es_regiao que pertencem à filial
+    # Segundos de cada comando SQL antes de ser cancelado no servidor; cabe
+    # algumas vezes dentro de `timeout`, porque banco() faz mais de uma consulta
+    timeout_consulta: float = 20
+
+
+REGIOES = [
+    Regiao('Cariri', 'RJ CARIRI', 'WiBiERP_CAR', timeout=60, es_regiao=(1, 2, 3)),
+    Regiao('Fortaleza', 'RJ FORTALEZA', 'WiBiERP_FOR', timeout=90, es_regiao=(1, 2, 4, 5), timeout_consulta=30),
+    Regiao('Quixadá', 'RJ QUIXADÁ', 'WiBiERP_QUI', timeout=60, es_regiao=(1, 2)),
+    Regiao('Sobral', 'RJ SOBRAL', 'WiBiERP_SOB', timeout=60, es_regiao=(1, 2, 3)),
+    Regiao('São Luis', 'RJ SÃO LUIS', 'WiBiERP_SLS', timeout=90, es_regiao=(1, 2, 3, 4, 6, 8, 9), timeout_consulta=30),
+]
+
+_POR_DATABASE = {regiao.database: regiao for regiao in REGIOES}
+
+
+def regiao_do_banco(database_name):
+    return _POR_DATABASE[database_name]
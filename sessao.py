@@ -0,0 +1,91 @@
+"""Sessão do usuário logado: token assinado e última visão do painel.
+
+A senha é conferida com bcrypt uma vez, no login (login.py). Daqui em
+diante cada rerun só confere a assinatura e a validade do token JWT
+guardado no session_state, o que custa microssegundos.
+"""
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+import jwt
+import streamlit as st
+
+
+DURACAO = 12 * 60 * 60  # segundos de validade do token
+
+# Última (ano, seção) de cada usuário, compartilhada entre sessões e reinícios
+PREFERENCIAS_ARQUIVO = os.environ.get('PREFERENCIAS_ARQUIVO', 'preferencias.json')
+
+
+@st.cache_resource
+def _chave():
+    # Sem chave_sessao nos secrets cada processo sorteia a sua, e os tokens
+    # deixam de valer quando ele reinicia
+    try:
+        return st.secrets['chave_sessao']
+    except (KeyError, FileNotFoundError):
+        return secrets.token_hex(32)
+
+
+def entrar(usuario):
+    token = jwt.encode({'sub': usuario, 'exp': int(time.time()) + DURACAO}, _chave(), algorithm='HS256')
+    st.session_state['token'] = token
+
+
+def sair():
+    # Tudo o que a sessão guardou é do usuário que está saindo (visão, carga
+    # antecipada, regiões abertas); quem entrar depois começa do zero
+    for chave in list(st.session_state.keys()):
+        del st.session_state[chave]
+
+
+def usuario_logado():
+    """Usuário dono do token da sessão, ou None se não há token válido."""
+    token = st.session_state.get('token')
+    if token is None:
+        return None
+    try:
+        return jwt.decode(token, _chave(), algorithms=['HS256'])['sub']
+    except jwt.InvalidTokenError:
+        sair()
+        return None
+
+
+_lock_preferencias = threading.Lock()
+
+
+def _ler_preferencias():
+    try:
+        with open(PREFERENCIAS_ARQUIVO, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def ultima_visao(usuario):
+    """(ano, seção) da última visita do usuário, ou None."""
+    visao = _ler_preferencias().get(usuario)
+    return tuple(visao) if visao else None
+
+
+def lembrar_visao(usuario, ano, secao):
+    with _lock_preferencias:
+        preferencias = _ler_preferencias()
+        if preferencias.get(usuario) == [ano, secao]:
+            return
+        preferencias[usuario] = [ano, secao]
+
+        # Arquivo temporário + rename: outra sessão nunca lê o JSON pela metade
+        pasta = os.path.dirname(os.path.abspath(PREFERENCIAS_ARQUIVO))
+        descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.json.tmp')
+        try:
+            with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+                json.dump(preferencias, arquivo, ensure_ascii=False)
+            os.replace(temporario, PREFERENCIAS_ARQUIVO)
+        except BaseException:
+            os.remove(temporario)
+            raise
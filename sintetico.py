@@ -0,0 +1,148 @@
+"""Réplica sintética do ERP em SQLite, para medir o dashboard sem o SQL Server.
+
+    python sintetico.py --itens 10M --anos 2023 2024
+
+Cria <pasta>/<database>.sqlite para cada região com as tabelas e colunas
+que dados.py consulta. Com a variável de ambiente BANCO_LOCAL=<pasta> o
+dashboard e o benchmark.py consultam essas réplicas em vez do ERP.
+"""
+import argparse
+import os
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from dados import SECOES
+from regioes import REGIOES
+
+
+PASTA_SINTETICO = 'sintetico'
+
+# Tamanhos prontos, em linhas de t_vendas_itens por banco
+TAMANHOS = {'1M': 1_000_000, '10M': 10_000_000, '50M': 50_000_000}
+
+ITENS_POR_VENDA = 4
+ITENS_POR_CLIENTE = 200
+PRODUTOS = 2_000
+ESTRUTURAS = 20
+
+# Itens gerados e inseridos de cada vez: a memória não cresce com o tamanho
+LOTE = 500_000
+
+ESQUEMA = """
+CREATE TABLE t_calendar (cal_data TEXT PRIMARY KEY, cal_ano INTEGER, cal_mes INTEGER);
+CREATE TABLE t_estrutura (es_id INTEGER PRIMARY KEY, es_regiao INTEGER);
+CREATE TABLE t_clientes (cl_codigo INTEGER PRIMARY KEY, tp_status INTEGER);
+CREATE TABLE t_produtos_class (pc_codigo INTEGER PRIMARY KEY, pc_secao_descr_ TEXT);
+CREATE TABLE t_produtos (pr_codigo INTEGER PRIMARY KEY, pc_codigo INTEGER);
+CREATE TABLE t_vendas (
+    vd_codigo INTEGER PRIMARY KEY, vd_data_venda TEXT, cl_codigo INTEGER,
+    es_id INTEGER, vd_status INTEGER, vd_bonif INTEGER
+);
+CREATE TABLE t_vendas_itens (vd_codigo INTEGER, pr_codigo INTEGER, vi_qtd REAL, vi_valorunit REAL);
+"""
+
+# Criados depois da carga, que fica bem mais rápida sem eles
+INDICES = """
+CREATE INDEX ix_vendas_data ON t_vendas (vd_data_venda);
+CREATE INDEX ix_itens_venda ON t_vendas_itens (vd_codigo);
+ANALYZE;
+"""
+
+
+def itens_do_tamanho(texto):
+    """'10M' ou '250000' -> número de itens."""
+    return TAMANHOS.get(texto.upper()) or int(texto)
+
+
+def _inserir(connection, tabela, colunas):
+    marcadores = ', '.join('?' * len(colunas))
+    linhas = zip(*(np.asarray(coluna).tolist() for coluna in colunas))
+    connection.executemany(f'INSERT INTO {tabela} VALUES ({marcadores})', linhas)
+
+
+def gerar(database_name, itens, anos, pasta=PASTA_SINTETICO, semente=0):
+    """Cria a réplica de um banco com `itens` linhas de venda espalhadas pelos anos."""
+    regiao = next(regiao for regiao in REGIOES if regiao.database == database_name)
+    rng = np.random.default_rng(semente)
+
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'{database_name}.sqlite')
+    temporario = caminho + '.tmp'
+    if os.path.exists(temporario):
+        os.remove(temporario)
+
+    connection = sqlite3.connect(temporario)
+    try:
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.executescript(ESQUEMA)
+
+        anos = sorted(int(ano) for ano in anos)
+        dias = pd.date_range(date(anos[0], 1, 1), date(anos[-1], 12, 31), freq='D')
+        dias = dias[dias.year.isin(anos)]
+        datas = dias.strftime('%Y-%m-%d')
+        _inserir(connection, 't_calendar', [datas, dias.year, dias.month])
+
+        # Algumas estruturas ficam fora da região, para o filtro de es_regiao ter efeito
+        es_regiao = rng.choice(list(regiao.es_regiao) + [0], ESTRUTURAS)
+        _inserir(connection, 't_estrutura', [np.arange(1, ESTRUTURAS + 1), es_regiao])
+
+        clientes = max(itens // ITENS_POR_CLIENTE, 1)
+        tp_status = np.where(rng.random(clientes) < 0.9, 1, 2)
+        _inserir(connection, 't_clientes', [np.arange(1, clientes + 1), tp_status])
+
+        secoes = list(SECOES) + ['OUTROS']
+        _inserir(connection, 't_produtos_class', [np.arange(1, len(secoes) + 1), secoes])
+        _inserir(connection, 't_produtos', [np.arange(1, PRODUTOS + 1), rng.integers(1, len(secoes) + 1, PRODUTOS)])
+
+        proxima_venda = 1
+        for inicio in range(0, itens, LOTE):
+            quantidade = min(LOTE, itens - inicio)
+            vendas = -(-quantidade // ITENS_POR_VENDA)
+            codigos = np.arange(proxima_venda, proxima_venda + vendas)
+            proxima_venda += vendas
+
+            _inserir(connection, 't_vendas', [
+                codigos,
+                datas[rng.integers(0, len(datas), vendas)],
+                rng.integers(1, clientes + 1, vendas),
+                rng.integers(1, ESTRUTURAS + 1, vendas),
+                np.where(rng.random(vendas) < 0.02, 12, 1),  # 12 = cancelada
+                (rng.random(vendas) < 0.03).astype(int),  # bonificação
+            ])
+            _inserir(connection, 't_vendas_itens', [
+                np.repeat(codigos, ITENS_POR_VENDA)[:quantidade],
+                rng.integers(1, PRODUTOS + 1, quantidade),
+                rng.integers(1, 25, quantidade),
+                np.round(rng.gamma(2.0, 15.0, quantidade), 2),
+            ])
+            connection.commit()
+
+        connection.executescript(INDICES)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera réplicas SQLite sintéticas dos bancos do ERP.")
+    parser.add_argument('--itens', default='1M', help="linhas de t_vendas_itens por banco: 1M, 10M, 50M ou um número")
+    parser.add_argument('--anos', nargs='+', default=[str(date.today().year - 1), str(date.today().year)])
+    parser.add_argument('--bancos', nargs='+', default=[regiao.database for regiao in REGIOES])
+    parser.add_argument('--pasta', default=PASTA_SINTETICO, help="pasta de destino dos arquivos .sqlite")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    itens = itens_do_tamanho(args.itens)
+    for posicao, database_name in enumerate(args.bancos):
+        caminho = gerar(database_name, itens, args.anos, args.pasta, args.semente + posicao)
+        print(f"{database_name}: {itens} itens em {caminho}")
+
+
+if __name__ == '__main__':
+    main()
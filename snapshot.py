@@ -0,0 +1,72 @@
+"""Cópia local, em Parquet, das agregações diárias de cada banco do ERP.
+
+Gerada fora do dashboard por um job agendado:
+
+    python snapshot.py 2022 2023 2024
+
+Com a variável de ambiente FONTE_DADOS=snapshot o dashboard lê só daqui e
+não consulta o ERP.
+"""
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+
+PASTA_SNAPSHOT = os.environ.get('SNAPSHOT_DIR', 'snapshot')
+
+
+# Um arquivo por banco e tipo: vendas por dia e clientes por mês
+def _arquivo(database_name, pasta, tipo):
+    nome = database_name if tipo == 'vendas' else f'{database_name}.{tipo}'
+    return os.path.join(pasta, f'{nome}.parquet')
+
+
+def gravar(database_name, df, pasta=PASTA_SNAPSHOT, tipo='vendas'):
+    """Grava o snapshot do banco de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.parquet.tmp')
+    os.close(descritor)
+    try:
+        df.to_parquet(temporario, engine='pyarrow', index=False)
+        os.replace(temporario, _arquivo(database_name, pasta, tipo))
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+
+def ler(database_name, anos, secoes, pasta=PASTA_SNAPSHOT, tipo='vendas'):
+    """Linhas dos anos e seções pedidos, no mesmo formato de dados.consultar()
+    (tipo "vendas") ou dados.consultar_clientes() (tipo "clientes")."""
+    return pd.read_parquet(
+        _arquivo(database_name, pasta, tipo),
+        engine='pyarrow',
+        filters=[('Ano', 'in', [int(a) for a in anos]), ('Seção', 'in', list(secoes))],
+        memory_map=True,
+    )
+
+
+def materializar(anos, pasta=PASTA_SNAPSHOT):
+    # Importa aqui para que o dashboard possa importar este módulo sem ciclo
+    from dados import SECOES, consultar, consultar_clientes
+    from regioes import REGIOES
+
+    for regiao in REGIOES:
+        vendas = consultar(regiao.database, anos, SECOES)
+        gravar(regiao.database, vendas, pasta)
+        ativos = consultar_clientes(regiao.database, anos, SECOES)
+        gravar(regiao.database, ativos, pasta, tipo='clientes')
+        print(f"{regiao.database}: {len(vendas)} linhas de vendas, {len(ativos)} de clientes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o snapshot local das vendas diárias de todas as regiões.")
+    parser.add_argument('anos', nargs='+', help="anos a materializar")
+    parser.add_argument('--pasta', default=PASTA_SNAPSHOT, help="pasta de destino dos arquivos Parquet")
+    args = parser.parse_args()
+    materializar(args.anos, args.pasta)
+
+
+if __name__ == '__main__':
+    main()
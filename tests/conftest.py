@@ -0,0 +1,5 @@
+import os
+
+# Antes de qualquer importação do projeto: os testes não gravam o cache em
+# disco na pasta do repositório
+os.environ['CACHE_DIR'] = ''
@@ -0,0 +1,66 @@
+from datetime import date
+
+import pandas as pd
+
+from dados import clientes_distintos, mensal, tratar_clientes, tratar_diario
+
+
+def vendas(linhas):
+    return tratar_diario(
+        pd.DataFrame(linhas, columns=['Ano', 'Mês', 'Seção', 'Data', 'Faturamento', 'Positivação']),
+        'WiBiERP_CAR',
+    )
+
+
+def ativos(linhas, database_name='WiBiERP_CAR'):
+    return tratar_clientes(pd.DataFrame(linhas, columns=['Ano', 'Mês', 'Seção', 'cl_codigo']), database_name)
+
+
+def test_positivacao_do_mes_conta_cada_cliente_uma_vez():
+    # O cliente 1 comprou nos dois dias: a soma dos distintos diários daria 3
+    dias = vendas([
+        (2024, 1, 'FINI', date(2024, 1, 2), 100.0, 2),
+        (2024, 1, 'FINI', date(2024, 1, 3), 50.0, 1),
+        (2024, 2, 'FINI', date(2024, 2, 1), 30.0, 1),
+    ])
+    clientes = ativos([(2024, 1, 'FINI', 1), (2024, 1, 'FINI', 2), (2024, 2, 'FINI', 1)])
+
+    df = mensal(dias, clientes, 'WiBiERP_CAR')
+    assert df['Mês'].astype(str).tolist() == ['janeiro', 'fevereiro']
+    assert df['Faturamento'].tolist() == [150.0, 30.0]
+    assert df['Positivação'].tolist() == [2, 1]
+
+
+def test_mes_sem_clientes_tem_positivacao_zero():
+    dias = vendas([(2024, 3, 'FINI', date(2024, 3, 5), 10.0, 0)])
+    df = mensal(dias, ativos([]), 'WiBiERP_CAR')
+    assert df['Positivação'].tolist() == [0]
+
+
+def test_mensal_leva_a_idade_e_o_aviso_de_antigo():
+    dias = vendas([(2024, 1, 'FINI', date(2024, 1, 2), 100.0, 1)])
+    clientes = ativos([(2024, 1, 'FINI', 1)])
+    dias.attrs['dados_de'] = 200.0
+    clientes.attrs.update(dados_de=100.0, antigo=True)
+
+    df = mensal(dias, clientes, 'WiBiERP_CAR')
+    assert df.attrs['dados_de'] == 100.0
+    assert df.attrs['antigo'] is True
+
+
+def test_clientes_distintos_no_periodo():
+    clientes = ativos([
+        (2024, 1, 'FINI', 1),
+        (2024, 2, 'FINI', 1),
+        (2024, 4, 'FINI', 2),
+    ])
+    assert clientes_distintos(clientes) == 2
+    assert clientes_distintos(clientes, por=['Trimestre']).to_dict() == {1: 1, 2: 1}
+
+
+def test_mesmo_codigo_em_filiais_diferentes_sao_clientes_diferentes():
+    clientes = pd.concat([
+        ativos([(2024, 1, 'FINI', 1)], 'WiBiERP_CAR'),
+        ativos([(2024, 1, 'FINI', 1)], 'WiBiERP_FOR'),
+    ], ignore_index=True)
+    assert clientes_distintos(clientes) == 2
@@ -0,0 +1,118 @@
+import pytest
+
+import disjuntor
+from disjuntor import CircuitoAberto, Disjuntor
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(disjuntor.time, 'monotonic', relogio)
+    return relogio
+
+
+def abrir(circuito, limite=3):
+    for _ in range(limite):
+        circuito.verificar()
+        circuito.falha()
+
+
+def test_fechado_deixa_passar(relogio):
+    circuito = Disjuntor('WiBiERP_CAR')
+    circuito.verificar()
+    circuito.falha()
+    circuito.falha()
+    circuito.verificar()
+    assert not circuito.aberto
+
+
+def test_sucesso_zera_as_falhas(relogio):
+    circuito = Disjuntor('WiBiERP_CAR')
+    circuito.falha()
+    circuito.falha()
+    circuito.sucesso()
+    circuito.falha()
+    circuito.falha()
+    assert not circuito.aberto
+
+
+def test_abre_no_limite_de_falhas(relogio):
+    circuito = Disjuntor('WiBiERP_CAR', espera=120)
+    abrir(circuito)
+    assert circuito.aberto
+    with pytest.raises(CircuitoAberto) as erro:
+        circuito.verificar()
+    assert erro.value.database_name == 'WiBiERP_CAR'
+
+    relogio.agora += 119
+    with pytest.raises(CircuitoAberto):
+        circuito.verificar()
+
+
+def test_passada_a_espera_deixa_uma_chamada_de_teste(relogio):
+    circuito = Disjuntor('WiBiERP_CAR', espera=120)
+    abrir(circuito)
+    relogio.agora += 120
+
+    circuito.verificar()
+    # Enquanto o teste não termina, as outras chamadas continuam barradas
+    with pytest.raises(CircuitoAberto):
+        circuito.verificar()
+
+
+def test_teste_com_sucesso_fecha(relogio):
+    circuito = Disjuntor('WiBiERP_CAR', espera=120)
+    abrir(circuito)
+    relogio.agora += 120
+
+    circuito.verificar()
+    circuito.sucesso()
+    assert not circuito.aberto
+    circuito.verificar()
+    circuito.verificar()
+
+
+def test_teste_com_falha_abre_por_mais_uma_espera(relogio):
+    circuito = Disjuntor('WiBiERP_CAR', espera=120)
+    abrir(circuito)
+    relogio.agora += 120
+
+    circuito.verificar()
+    circuito.falha()
+    assert circuito.aberto
+    with pytest.raises(CircuitoAberto):
+        circuito.verificar()
+
+    relogio.agora += 120
+    circuito.verificar()
+
+
+def test_qualquer_erro_na_leitura_encerra_o_teste(relogio, monkeypatch):
+    import dados
+
+    circuito = Disjuntor('WiBiERP_CAR', espera=120)
+    monkeypatch.setattr(dados, 'disjuntor', lambda database_name: circuito)
+
+    def falhar(database_name, query, params):
+        raise KeyError('coluna')
+
+    monkeypatch.setattr(dados, '_executar', falhar)
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            dados._ler('WiBiERP_CAR', 'SELECT 1', [])
+    assert circuito.aberto
+
+    relogio.agora += 120
+    with pytest.raises(KeyError):
+        dados._ler('WiBiERP_CAR', 'SELECT 1', [])
+    # O teste falhou: o circuito reabre e libera outro teste depois da espera
+    relogio.agora += 120
+    circuito.verificar()
@@ -0,0 +1,18 @@
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from exportacao import COLUNAS, gerar
+
+
+def test_parquet_sem_linhas_tem_esquema():
+    vazio = pd.DataFrame(columns=[coluna for coluna in COLUNAS if coluna != 'Região'])
+    tabela = pq.read_table(io.BytesIO(gerar({'cariri': vazio}, 'Parquet')))
+    assert tabela.num_rows == 0
+    assert tabela.column_names == COLUNAS
+
+
+def test_csv_sem_linhas_tem_cabecalho():
+    texto = gerar({}, 'CSV').decode('utf-8-sig')
+    assert texto == ';'.join(COLUNAS) + '\n'
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from formatacao import formatar_numero, formatar_real, nome_do_mes
+
+
+def test_separa_milhares_e_decimais():
+    assert list(formatar_numero([0, 1.5, 999.999, 1234567.891])) == ['0,00', '1,50', '1.000,00', '1.234.567,89']
+
+
+def test_negativos():
+    assert list(formatar_numero([-1234.5, -0.5])) == ['-1.234,50', '-0,50']
+
+
+def test_negativo_que_arredonda_para_zero_nao_leva_sinal():
+    assert list(formatar_numero([-0.004])) == ['0,00']
+
+
+def test_sem_casas_decimais():
+    assert list(formatar_numero([1234567.5, 999.4, -1500], casas=0)) == ['1.234.568', '999', '-1.500']
+
+
+def test_mantem_o_indice():
+    valores = pd.Series([10.0, 20.0], index=[7, 3])
+    assert formatar_numero(valores).index.tolist() == [7, 3]
+
+
+def test_real():
+    assert list(formatar_real([1234.5])) == ['R$ 1.234,50']
+
+
+def test_nome_do_mes():
+    meses = nome_do_mes([1, 3, 12])
+    assert list(meses) == ['janeiro', 'março', 'dezembro']
+    assert meses.ordered
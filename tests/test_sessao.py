@@ -0,0 +1,41 @@
+from streamlit.testing.v1 import AppTest
+
+
+def trocar_de_usuario():
+    import streamlit as st
+
+    import sessao
+
+    # charles entra, escolhe uma visão e sai; Noam entra na mesma sessão
+    sessao.entrar('charles')
+    st.session_state['visao'] = ('2025', 'RICLAN')
+    st.session_state['pre_carga'] = (['2025'], None)
+    st.session_state['abrir_WiBiERP_CAR'] = False
+    sessao.sair()
+    st.session_state['depois_de_sair'] = sorted(st.session_state.keys())
+    sessao.entrar('Noam')
+    st.session_state['usuario'] = sessao.usuario_logado()
+
+
+def test_sair_limpa_a_sessao_do_usuario_anterior():
+    app = AppTest.from_function(trocar_de_usuario).run()
+    assert not app.exception
+    assert app.session_state['depois_de_sair'] == []
+    assert app.session_state['usuario'] == 'Noam'
+    assert 'visao' not in app.session_state
+    assert 'pre_carga' not in app.session_state
+
+
+def test_token_invalido_desloga():
+    def pagina():
+        import streamlit as st
+
+        import sessao
+
+        st.session_state['token'] = 'não é um jwt'
+        st.session_state['visao'] = ('2025', 'RICLAN')
+        st.session_state['usuario'] = sessao.usuario_logado()
+
+    app = AppTest.from_function(pagina).run()
+    assert app.session_state['usuario'] is None
+    assert 'visao' not in app.session_state